@@ -75,6 +75,26 @@ def get_calc_loc(target_name, calc_locs):
         return calc_locs[-1]
 
 
+def get_calc_dir(task, fw_spec):
+    """
+    Helper method that resolves the directory a Firetask should work in from its
+    "calc_dir" or "calc_loc" parameters.
+
+    Args:
+        task (FiretaskBase): the Firetask, optionally with calc_dir or calc_loc set
+        fw_spec (dict): the spec of the running Firework
+
+    Returns:
+        (str) calc_dir if set, else the path of the matching calc_loc if calc_loc is
+            set (see get_calc_loc), else the current working directory
+    """
+    if "calc_dir" in task:
+        return task["calc_dir"]
+    elif task.get("calc_loc"):
+        return get_calc_loc(task["calc_loc"], fw_spec["calc_locs"])["path"]
+    return os.getcwd()
+
+
 @explicit_serialize
 class CopyFilesFromCalcLoc(FiretaskBase):
     """
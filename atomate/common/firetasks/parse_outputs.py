@@ -2,14 +2,10 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import json
-import os
-
 from fireworks import explicit_serialize, FiretaskBase, FWAction
-from fireworks.utilities.fw_serializers import DATETIME_HANDLER
 
-from atomate.utils.utils import env_chk, get_logger, load_class
-from atomate.common.firetasks.glue_tasks import get_calc_loc
+from atomate.utils.utils import dump_json, env_chk, get_logger, load_class, task_doc_default
+from atomate.common.firetasks.glue_tasks import get_calc_dir
 
 __author__ = 'Shyam Dwaraknath <shyamd@lbl.gov>, Anubhav Jain <ajain@lbl.gov>'
 
@@ -28,6 +24,8 @@ class ToDbTask(FiretaskBase):
     Optional params:
         db_file (str): path to file containing the database credentials. Supports env_chk.
             Default is None, which will write data to JSON file.
+        gzip_json (bool): if no db_file is set, write the task doc gzip compressed to
+            task.json.gz instead of task.json. Default: False.
         mmdb (MMDb) (str): If db_file, sets the type of MMDb, e.g. "atomate.vasp.database.MMVaspDb"
         calc_dir (str): path to dir (on current filesystem) that contains calculation output files.
             Default: use current working directory.
@@ -35,30 +33,36 @@ class ToDbTask(FiretaskBase):
             recent calc_loc with the matching name
         options (dict): dict of options to pass into the Drone
         additional_fields (dict): dict of additional fields to add
+        fast_insert (bool): insert the task document without waiting for the database to
+            acknowledge the write. There is no check for an existing task with the same
+            dir_name, and the task_id is the string of a client-side generated ObjectId
+            (not an integer from the counter). Default: False.
+        batch_size (int): with fast_insert, number of task documents to buffer and insert
+            together. Buffered documents are not visible to later Fireworks querying the
+            tasks collection (e.g., analysis tasks) until the buffer is full or the process
+            exits normally, and they are lost if the process is killed (e.g., at a walltime
+            limit). Failed writes are never reported. Default: 1.
     """
 
     required_params = ["drone"]
-    optional_params = ["mmdb", "db_file", "calc_dir", "calc_loc", "additional_fields", "options"]
+    optional_params = ["mmdb", "db_file", "calc_dir", "calc_loc", "additional_fields", "options",
+                       "fast_insert", "batch_size", "gzip_json"]
 
     def run_task(self, fw_spec):
         # get the directory that contains the dir to parse
-        calc_dir = os.getcwd()
-        if "calc_dir" in self:
-            calc_dir = self["calc_dir"]
-        elif self.get("calc_loc"):
-            calc_dir = get_calc_loc(self["calc_loc"], fw_spec["calc_locs"])["path"]
+        calc_dir = get_calc_dir(self, fw_spec)
 
         # parse the calc directory
-        logger.info("PARSING DIRECTORY: {} USING DRONE: {}".format(
-            calc_dir, self['drone'].__class__.__name__))
+        logger.info("PARSING DIRECTORY: %s USING DRONE: %s",
+                    calc_dir, self['drone'].__class__.__name__)
         # get the database connection
         db_file = env_chk(self.get('db_file'), fw_spec)
 
         drone = self['drone'].__class__()
         task_doc = drone.assimilate(calc_dir)
         if not db_file:
-            with open("task.json", "w") as f:
-                f.write(json.dumps(task_doc, default=DATETIME_HANDLER))
+            filename = "task.json.gz" if self.get("gzip_json", False) else "task.json"
+            dump_json(task_doc, filename, default=task_doc_default, serialize_numpy=True)
         else:
             mmdb_str = self["mmdb"]
             modname, classname = mmdb_str.strip().rsplit(".", 1)
@@ -66,8 +70,11 @@ class ToDbTask(FiretaskBase):
             db = cls_.from_db_file(db_file)
 
             # insert the task document
-            t_id = db.insert(task_doc)
-            logger.info("Finished parsing with task_id: {}".format(t_id))
+            if self.get("fast_insert", False):
+                t_id = db.insert_fast(task_doc, batch_size=self.get("batch_size", 1))
+            else:
+                t_id = db.insert(task_doc)
+            logger.info("Finished parsing with task_id: %s", t_id)
 
         return FWAction(stored_data={"task_id": task_doc.get("task_id", None)},
                         defuse_children=(task_doc["state"] != "successful"))
@@ -8,7 +8,8 @@ from fireworks import LaunchPad
 from fireworks.core.firework import Firework, Workflow
 from fireworks.core.rocket_launcher import rapidfire
 
-from atomate.common.firetasks.glue_tasks import PassCalcLocs, get_calc_loc, CopyFilesFromCalcLoc, CreateFolder, DeleteFiles
+from atomate.common.firetasks.glue_tasks import PassCalcLocs, get_calc_loc, get_calc_dir, CopyFilesFromCalcLoc, \
+    CreateFolder, DeleteFiles
 from atomate.vasp.firetasks.glue_tasks import CopyVaspOutputs
 
 from atomate.utils.testing import AtomateTest
@@ -45,6 +46,11 @@ class TestPassCalcLocs(AtomateTest):
         self.assertEqual(get_calc_loc("fw2", calc_locs), calc_locs[1])
         self.assertEqual(get_calc_loc(True, calc_locs), calc_locs[1])
 
+        self.assertEqual(get_calc_dir({"calc_loc": "fw1"}, fw3.spec), calc_locs[0]["path"])
+        self.assertEqual(get_calc_dir({"calc_loc": True}, fw3.spec), calc_locs[1]["path"])
+        self.assertEqual(get_calc_dir({"calc_dir": "/tmp", "calc_loc": True}, fw3.spec), "/tmp")
+        self.assertEqual(get_calc_dir({}, fw3.spec), os.getcwd())
+
 
 class TestDeleteFiles(AtomateTest):
 
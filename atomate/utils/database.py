@@ -6,10 +6,18 @@ from __future__ import division, print_function, unicode_literals, absolute_impo
 This module defines a base class for derived database classes that store calculation data.
 """
 
+import atexit
 import datetime
+import os
+import threading
+from multiprocessing.util import Finalize
 from abc import ABCMeta, abstractmethod
+from functools import lru_cache
 import six
-from pymongo import MongoClient, ReturnDocument
+import bson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient, ReturnDocument, WriteConcern
 
 from monty.json import jsanitize
 from monty.serialization import loadfn
@@ -22,6 +30,111 @@ __email__ = 'kmathew@lbl.gov'
 
 logger = get_logger(__name__)
 
+# task documents buffered by CalcDb.insert_fast: {key: (collection, [docs])}
+_insert_buffers = {}
+_insert_lock = threading.Lock()
+# pid of the process that registered the flush_inserts finalizer
+_flush_pid = None
+
+
+@lru_cache(maxsize=8)
+def _load_db_file(db_file, mtime):
+    """
+    Load the database credentials file. Cached on the path and modification
+    time so that repeated FireTask invocations don't re-read an unchanged file.
+    """
+    return loadfn(db_file)
+
+
+def _get_client(host, port, user, password, **kwargs):
+    """
+    Return a MongoClient for the given connection parameters, reusing the
+    client (and its connection pool) across CalcDb instances of the same
+    process. MongoClient is not fork-safe, so a forked child gets its own.
+    """
+    if isinstance(host, list):
+        # list of replica set members
+        host = tuple(host)
+    key = (host, port, user, password, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        # unhashable MongoClient options can't be cached
+        return MongoClient(host=host, port=port, username=user, password=password, **kwargs)
+    return _get_cached_client(*key, pid=os.getpid())
+
+
+@lru_cache(maxsize=8)
+def _get_cached_client(host, port, user, password, kwargs, pid):
+    """
+    Cached MongoClient factory behind _get_client.
+
+    Args:
+        kwargs (tuple): sorted (key, value) pairs passed on to MongoClient
+        pid (int): id of the process using the client
+    """
+    return MongoClient(host=host, port=port, username=user, password=password,
+                       **dict(kwargs))
+
+
+def set_client_side_ids(d):
+    """
+    Give a document an ObjectId _id and, if it has none, a task_id derived from it,
+    so that its id is known without waiting for the database.
+
+    Args:
+        d (dict): task document, updated in place
+
+    Returns:
+        the task_id of the document
+    """
+    if not d.get("_id"):
+        d["_id"] = ObjectId()
+    if not d.get("task_id"):
+        d["task_id"] = str(d["_id"])
+    return d["task_id"]
+
+
+def flush_inserts():
+    """
+    Insert all task documents still buffered by CalcDb.insert_fast. Registered
+    to run at interpreter exit, and at the exit of multiprocessing children
+    (e.g., from "rlaunch multi"), which leave through os._exit and skip atexit.
+    """
+    with _insert_lock:
+        pending = [(collection, list(docs)) for collection, docs in _insert_buffers.values() if docs]
+        for _, docs in _insert_buffers.values():
+            del docs[:]
+    for collection, docs in pending:
+        collection.insert_many(docs, ordered=False)
+
+
+def _register_flush():
+    """
+    Make sure flush_inserts runs when the current process exits. multiprocessing
+    runs its finalizers in both the main process (through atexit) and its children,
+    but a forked child starts with an empty finalizer registry, hence once per pid.
+    """
+    global _flush_pid
+    if _flush_pid != os.getpid():
+        Finalize(None, flush_inserts, exitpriority=10)
+        _flush_pid = os.getpid()
+
+
+def _reset_insert_buffers():
+    """
+    Drop the buffers inherited by a forked child: they belong to the parent, which
+    inserts them itself. The lock is replaced too, it may have been held at fork time.
+    """
+    global _insert_buffers, _insert_lock
+    _insert_buffers = {}
+    _insert_lock = threading.Lock()
+
+
+atexit.register(flush_inserts)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_insert_buffers)
+
 
 class CalcDb(six.with_metaclass(ABCMeta)):
 
@@ -33,9 +146,8 @@ class CalcDb(six.with_metaclass(ABCMeta)):
         self.port = int(port)
 
         try:
-            self.connection = MongoClient(host=self.host, port=self.port,
-                                          username=self.user,
-                                          password=self.password, **kwargs)
+            self.connection = _get_client(self.host, self.port, self.user, self.password,
+                                          **kwargs)
             self.db = self.connection[self.db_name]
         except:
             logger.error("Mongodb connection failed")
@@ -80,18 +192,64 @@ class CalcDb(six.with_metaclass(ABCMeta)):
                     d["task_id"] = self.db.counter.find_one_and_update(
                         {"_id": "taskid"}, {"$inc": {"c": 1}},
                         return_document=ReturnDocument.AFTER)["c"]
-                logger.info("Inserting {} with taskid = {}".format(d["dir_name"], d["task_id"]))
+                logger.info("Inserting %s with taskid = %s", d["dir_name"], d["task_id"])
             elif update_duplicates:
                 d["task_id"] = result["task_id"]
-                logger.info("Updating {} with taskid = {}".format(d["dir_name"], d["task_id"]))
+                logger.info("Updating %s with taskid = %s", d["dir_name"], d["task_id"])
             d = jsanitize(d, allow_bson=True)
+            # a single upsert on dir_name; bulk_write with bypass_document_validation is no
+            # faster for one operation and needs the bypassDocumentValidation privilege
             self.collection.update_one({"dir_name": d["dir_name"]},
                                        {"$set": d}, upsert=True)
             return d["task_id"]
         else:
-            logger.info("Skipping duplicate {}".format(d["dir_name"]))
+            logger.info("Skipping duplicate %s", d["dir_name"])
             return None
 
+    def insert_fast(self, d, batch_size=1):
+        """
+        Insert the task document without waiting for the server to acknowledge the
+        write (write concern w=0). Documents are buffered and inserted with a single
+        insert_many call once batch_size of them have accumulated; anything left in the
+        buffer is inserted when the process exits normally (see flush_inserts).
+
+        Buffered documents are lost if the process is killed (e.g., SIGKILL or a batch
+        system walltime limit) even though their task_id has already been returned, and
+        with w=0 a write that fails on the server (e.g., a duplicate _id) is not reported.
+
+        Unlike insert(), this does not look for duplicates and, unless the document
+        already has one, uses the string of a client-side generated ObjectId as task_id.
+        The document is encoded to BSON right away, so buffered documents are held as
+        compact bytes rather than as Python object trees.
+
+        Args:
+            d (dict): task document
+            batch_size (int): number of documents to buffer before inserting them
+
+        Returns:
+            the task_id of the document
+        """
+        task_id = set_client_side_ids(d)
+        d["last_updated"] = datetime.datetime.utcnow()
+        d = RawBSONDocument(bson.encode(jsanitize(d, allow_bson=True)))
+
+        collection = self.collection.with_options(write_concern=WriteConcern(w=0))
+        key = (id(self.connection), collection.full_name)
+        if batch_size > 1:
+            _register_flush()
+        with _insert_lock:
+            docs = _insert_buffers.setdefault(key, (collection, []))[1]
+            docs.append(d)
+            if len(docs) >= batch_size:
+                batch = list(docs)
+                del docs[:]
+            else:
+                batch = None
+        if batch:
+            logger.info("Inserting %d task documents without acknowledgement", len(batch))
+            collection.insert_many(batch, ordered=False)
+        return task_id
+
     @abstractmethod
     def reset(self):
         pass
@@ -110,7 +268,7 @@ class CalcDb(six.with_metaclass(ABCMeta)):
         Returns:
             MMDb object
         """
-        creds = loadfn(db_file)
+        creds = _load_db_file(db_file, os.path.getmtime(db_file))
 
         if admin and "admin_user" not in creds and "readonly_user" in creds:
             raise ValueError("Trying to use admin credentials, "
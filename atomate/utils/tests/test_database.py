@@ -0,0 +1,129 @@
+# coding: utf-8
+
+from __future__ import division, print_function, unicode_literals, absolute_import
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+from bson import ObjectId
+
+from atomate.utils.database import set_client_side_ids, flush_inserts, _get_client
+from atomate.utils.testing import AtomateTest
+from atomate.vasp.database import VaspCalcDb
+
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common",
+                       "test_files", "db.json")
+
+
+def _insert_in_child(dir_name):
+    VaspCalcDb.from_db_file(DB_FILE).insert_fast({"dir_name": dir_name}, batch_size=10)
+
+
+class ClientSideIdsTest(unittest.TestCase):
+
+    def test_set_client_side_ids(self):
+        d = {"dir_name": "/test"}
+        task_id = set_client_side_ids(d)
+        self.assertIsInstance(d["_id"], ObjectId)
+        self.assertEqual(task_id, str(d["_id"]))
+        self.assertEqual(d["task_id"], task_id)
+
+        # existing ids are kept, so calling it again is a no-op
+        self.assertEqual(set_client_side_ids(d), task_id)
+        self.assertEqual(d["task_id"], str(d["_id"]))
+
+        d = {"dir_name": "/test", "task_id": 12}
+        self.assertEqual(set_client_side_ids(d), 12)
+        self.assertIsInstance(d["_id"], ObjectId)
+
+
+class ClientCacheTest(unittest.TestCase):
+
+    def test_get_client(self):
+        # MongoClient connects in the background, so no server is needed here
+        client = _get_client("localhost", 27017, None, None, connect=False)
+        self.assertIs(_get_client("localhost", 27017, None, None, connect=False), client)
+        self.assertIsNot(_get_client("localhost", 27018, None, None, connect=False), client)
+
+        # replica sets are given as a list of hosts
+        hosts = ["localhost:27017", "localhost:27018"]
+        client = _get_client(hosts, 27017, None, None, connect=False)
+        self.assertIs(_get_client(list(hosts), 27017, None, None, connect=False), client)
+
+        # unhashable options are passed on without caching
+        client = _get_client("localhost", 27017, None, None, connect=False,
+                             event_listeners=[])
+        self.assertIsNot(_get_client("localhost", 27017, None, None, connect=False,
+                                     event_listeners=[]), client)
+
+
+class InsertFastTest(AtomateTest):
+
+    def setUp(self):
+        super(InsertFastTest, self).setUp()
+        self.mmdb = VaspCalcDb.from_db_file(DB_FILE)
+
+    def tearDown(self):
+        flush_inserts()
+        super(InsertFastTest, self).tearDown()
+
+    def count(self, n):
+        """
+        Number of task documents, waiting up to a few seconds for n of them to show up,
+        since unacknowledged writes may be applied after insert_many returns.
+        """
+        for _ in range(50):
+            c = self.mmdb.collection.find().count()
+            if c >= n:
+                break
+            time.sleep(0.1)
+        return c
+
+    def test_batch_size(self):
+        t_id1 = self.mmdb.insert_fast({"dir_name": "/test1"}, batch_size=2)
+        self.assertEqual(self.mmdb.collection.find().count(), 0)
+        t_id2 = self.mmdb.insert_fast({"dir_name": "/test2"}, batch_size=2)
+        self.assertEqual(self.count(2), 2)
+
+        doc = self.mmdb.collection.find_one({"dir_name": "/test1"})
+        self.assertEqual(doc["task_id"], t_id1)
+        self.assertEqual(str(doc["_id"]), t_id1)
+        self.assertIn("last_updated", doc)
+        self.assertEqual(self.mmdb.collection.find_one({"task_id": t_id2})["dir_name"], "/test2")
+
+    def test_flush_inserts(self):
+        self.mmdb.insert_fast({"dir_name": "/test1"}, batch_size=10)
+        self.assertEqual(self.mmdb.collection.find().count(), 0)
+        flush_inserts()
+        self.assertEqual(self.count(1), 1)
+        flush_inserts()  # nothing left to insert
+        self.assertEqual(self.mmdb.collection.find().count(), 1)
+
+    def test_flush_inserts_at_exit(self):
+        script = ("from atomate.vasp.database import VaspCalcDb\n"
+                  "mmdb = VaspCalcDb.from_db_file({!r})\n"
+                  "mmdb.insert_fast({{'dir_name': '/test_exit'}}, batch_size=10)\n").format(DB_FILE)
+        subprocess.check_call([sys.executable, "-c", script])
+        self.assertEqual(self.count(1), 1)
+        self.assertIsNotNone(self.mmdb.collection.find_one({"dir_name": "/test_exit"}))
+
+    def test_flush_inserts_in_child(self):
+        # multiprocessing children leave through os._exit, skipping atexit handlers
+        self.mmdb.insert_fast({"dir_name": "/test_parent"}, batch_size=10)
+        p = multiprocessing.get_context("fork").Process(target=_insert_in_child,
+                                                        args=("/test_child",))
+        p.start()
+        p.join()
+        self.assertEqual(self.count(1), 1)
+        # the child does not insert the documents buffered by its parent
+        self.assertEqual(self.mmdb.collection.find_one()["dir_name"], "/test_child")
+        flush_inserts()
+        self.assertEqual(self.count(2), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,14 +3,19 @@
 from __future__ import division, print_function, unicode_literals, \
     absolute_import
 
+import json
 import os
 from collections import defaultdict
+from datetime import datetime
 
+import numpy as np
 from pymongo.database import Database
+from pymatgen.core.units import FloatWithUnit
 
 from fireworks import FiretaskBase, Firework, Workflow, explicit_serialize, FWAction
 
-from atomate.utils.utils import env_chk, get_logger, get_mongolike, recursive_get_result, recursive_update, get_database, get_uri
+from atomate.utils.utils import env_chk, get_logger, get_mongolike, recursive_get_result, recursive_update, get_database, get_uri, \
+    json_iterdumps, dump_json, load_json, task_doc_default
 
 from atomate.utils.testing import AtomateTest
 
@@ -103,6 +108,54 @@ class UtilsTests(AtomateTest):
         recursive_update(d, {"a": {"b": [7]}})
         self.assertEqual(d["a"]["b"], [7])
 
+    def test_json_iterdumps(self):
+        d = {"a": [1, 2, {"b": [1.5, None]}], "c": {"d": "e", "f": []}, "g": {}}
+        for chunk_size in [1, 16, 1 << 16]:
+            s = b"".join(json_iterdumps(d, chunk_size=chunk_size)).decode()
+            self.assertEqual(json.loads(s), d)
+        self.assertEqual(b"".join(json_iterdumps([], chunk_size=1)), b"[]")
+
+        # long lists are split into chunks of about chunk_size bytes
+        d = {"energies": [i * 0.123456789 for i in range(10000)],
+             "projections": np.random.rand(20, 50, 9, 4)}
+        chunks = list(json_iterdumps(d, serialize_numpy=True, chunk_size=1024))
+        self.assertGreater(len(chunks), 100)
+        self.assertTrue(all(1024 <= len(c) < 4096 for c in chunks[:-1]))
+        s = b"".join(chunks).decode()
+        self.assertEqual(json.loads(s), {"energies": d["energies"],
+                                         "projections": d["projections"].tolist()})
+
+        # non-str keys are encoded like json.dumps does
+        d = {True: 1, False: 2, None: 3, 7: 4, 1.5: 5, "a": 6}
+        s = b"".join(json_iterdumps(d)).decode()
+        self.assertEqual(json.loads(s), json.loads(json.dumps(d)))
+
+    def test_dump_json(self):
+        d = {"a": [1, 2], "b": {"c": "d"}}
+        dump_json(d, "test.json")
+        dump_json({"a": 1}, "short.json")
+        dump_json(d, "short.json")  # truncates the existing file
+        dump_json(d, "test.json.gz")
+        for fname in ["test.json", "short.json", "test.json.gz"]:
+            self.assertEqual(load_json(fname), d)
+
+    def test_load_json_nan(self):
+        with open("nan.json", "w") as f:
+            json.dump({"a": float("nan"), "b": float("inf"), "c": 1}, f)
+        d = load_json("nan.json")
+        self.assertTrue(np.isnan(d["a"]))
+        self.assertEqual(d["b"], float("inf"))
+        self.assertEqual(d["c"], 1)
+
+    def test_dump_json_task_doc(self):
+        now = datetime.utcnow()
+        d = {"density": FloatWithUnit(2.33, "g cm^-3"), "energy": np.float64(-10.5),
+             "nsites": np.int64(2), "forces": np.array([[0.0, 0.1]]), "completed_at": now}
+        dump_json(d, "task.json", default=task_doc_default, serialize_numpy=True)
+        self.assertEqual(load_json("task.json"),
+                         {"density": 2.33, "energy": -10.5, "nsites": 2, "forces": [[0.0, 0.1]],
+                          "completed_at": now.isoformat()})
+
     def test_get_uri(self):
         self.assertTrue(MODULE_DIR in get_uri(MODULE_DIR))
 
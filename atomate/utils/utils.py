@@ -2,25 +2,44 @@
 
 from __future__ import division, print_function, unicode_literals, absolute_import
 
+import gzip
+import json
 import logging
 import os
 import sys
 import socket
+import zlib
+from enum import Enum
+from functools import lru_cache
 from random import randint
 from time import time
 
+import numpy as np
 import six
 from pymongo import MongoClient
-from monty.json import MontyDecoder
+from monty.json import MontyDecoder, MontyEncoder
 from monty.serialization import loadfn
 from pymatgen import Composition
 
 from fireworks import Workflow
+from fireworks.utilities.fw_serializers import DATETIME_HANDLER
 from pymatgen.alchemy.materials import TransformedStructure
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 __author__ = 'Anubhav Jain, Kiran Mathew'
 __email__ = 'ajain@lbl.gov, kmathew@lbl.gov'
 
+# MontyEncoder.default keeps no per-call state, so a single bound method is shared
+_monty_encoder_default = MontyEncoder().default
+
+if orjson is not None:
+    _ORJSON_OPTION = orjson.OPT_NON_STR_KEYS
+    _ORJSON_NUMPY_OPTION = _ORJSON_OPTION | orjson.OPT_SERIALIZE_NUMPY
+
 
 def env_chk(val, fw_spec, strict=True, default=None):
     """
@@ -293,6 +312,261 @@ def load_class(modulepath, classname):
     return getattr(mod, classname)
 
 
+def monty_default(obj):
+    """
+    Fallback hook for json_dumps that serializes objects which are not natively
+    JSON serializable: numpy scalars as numbers, Enums by value, everything else
+    (e.g., MSONable objects) the same way MontyEncoder does.
+
+    Args:
+        obj: object to serialize
+
+    Returns:
+        JSON serializable representation of obj
+    """
+    # numpy scalars are by far the most frequent objects hitting this hook (one call
+    # per element of e.g. a list of np.float64), so handle them before anything else
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Enum):
+        return obj.value
+    return _monty_encoder_default(obj)
+
+
+def task_doc_default(obj):
+    """
+    Fallback hook for writing task documents with json_dumps. The standard
+    library json module writes float subclasses (e.g., pymatgen's FloatWithUnit)
+    and numpy scalars as plain numbers, whereas orjson hands them to the hook;
+    convert those here and pass anything else on to DATETIME_HANDLER.
+
+    Args:
+        obj: object to serialize
+
+    Returns:
+        JSON serializable representation of obj
+    """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, float):
+        return float(obj)
+    if isinstance(obj, six.integer_types):
+        return int(obj)
+    return DATETIME_HANDLER(obj)
+
+
+def json_dumps(obj, default=None, serialize_numpy=False):
+    """
+    Serialize an object to JSON. Uses orjson if it is installed, which is
+    considerably faster for large task documents, and falls back to the
+    standard library json module otherwise. Note that orjson writes NaN and
+    Infinity as null, since they are not valid JSON.
+
+    Args:
+        obj: object to serialize
+        default (callable): called for objects that are not natively JSON
+            serializable, e.g. DATETIME_HANDLER or monty_default.
+        serialize_numpy (bool): serialize numpy arrays and scalars as plain
+            lists and numbers instead of passing them to default.
+
+    Returns:
+        (bytes) the UTF-8 encoded JSON document
+    """
+    if serialize_numpy:
+        default = _numpy_default(default)
+
+    if orjson is not None:
+        option = _ORJSON_NUMPY_OPTION if serialize_numpy else _ORJSON_OPTION
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(obj, default=default).encode()
+
+
+@lru_cache(maxsize=32)
+def _numpy_default(default):
+    """
+    Wrap a json_dumps default hook so that numpy arrays (including those orjson
+    does not handle natively, e.g. non-contiguous ones) are serialized as lists.
+    Wrappers are cached per hook, since json_iterdumps calls json_dumps for
+    every piece of a document.
+    """
+    def _default(obj):
+        if isinstance(obj, (np.ndarray, np.generic)):
+            return obj.tolist()
+        if default is None:
+            raise TypeError("Type is not JSON serializable: {}".format(type(obj).__name__))
+        return default(obj)
+    return _default
+
+
+def dump_json(obj, filename, default=None, serialize_numpy=False):
+    """
+    Serialize an object with json_iterdumps and write it to a file as it is
+    encoded, so that neither the full JSON document nor its compressed form is
+    held in memory. The chunks are handed to os.write directly, bypassing
+    Python's buffered file layer, which matters for task documents of hundreds
+    of MB. Filenames ending in ".gz" are gzip compressed (at the fastest
+    compression level).
+
+    Args:
+        obj: object to serialize
+        filename (str): path of the file to (over)write
+        default (callable): see json_dumps
+        serialize_numpy (bool): see json_dumps
+    """
+    chunks = json_iterdumps(obj, default=default, serialize_numpy=serialize_numpy)
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 31) if filename.endswith(".gz") else None
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        for chunk in chunks:
+            _write_all(fd, compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            _write_all(fd, compressor.flush())
+    finally:
+        os.close(fd)
+
+
+def _write_all(fd, data):
+    """
+    Write all of data to a file descriptor, as os.write may write only part of it.
+    """
+    data = memoryview(data)
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def load_json(filename):
+    """
+    Load a JSON file, reading it in one go and parsing it with orjson if it is
+    installed (stdlib json otherwise). Filenames ending in ".gz" are
+    decompressed first. Files orjson rejects, e.g. ones containing the NaN or
+    Infinity tokens written by json.dump, are parsed with stdlib json instead.
+
+    Args:
+        filename (str): path of the JSON file
+
+    Returns:
+        the decoded object
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    if filename.endswith(".gz"):
+        data = gzip.decompress(data)
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data.decode())
+
+
+@lru_cache(maxsize=4096, typed=True)
+def _encode_key(k):
+    """
+    Encode a dict key as a JSON object member name, including the trailing ":".
+    Non-string keys are converted the same way json.dumps and orjson's
+    OPT_NON_STR_KEYS do, e.g. True -> "true", None -> "null", 1.5 -> "1.5".
+    Task documents, DOS and band structures share a small, fixed set of keys
+    across runs, so the encoded keys are cached instead of re-encoded each time.
+    """
+    encoded = json_dumps(k)
+    if not encoded.startswith(b'"'):
+        encoded = json_dumps(encoded.decode())
+    return encoded + b":"
+
+
+def json_iterdumps(obj, default=None, serialize_numpy=False, chunk_size=1 << 16):
+    """
+    Incrementally serialize an object to JSON, yielding chunks of roughly chunk_size
+    bytes, so that a large document (e.g., a DOS or band structure) never has to be
+    held in memory as a single JSON string. Only containers whose encoded size is
+    estimated to exceed chunk_size are split up (e.g., down to per-band or per-k-point
+    slices of band structure projections); anything smaller, including runs of
+    consecutive list items, is serialized in one go with json_dumps.
+
+    Args:
+        obj: object to serialize
+        default (callable): called for objects that are not natively JSON
+            serializable, see json_dumps.
+        serialize_numpy (bool): see json_dumps. numpy arrays are then split like lists.
+        chunk_size (int): approximate size of the yielded chunks in bytes
+
+    Yields:
+        (bytes) consecutive chunks of the UTF-8 encoded JSON document
+    """
+    buf = []
+    size = 0
+    for piece in _iterencode(obj, default, serialize_numpy, chunk_size):
+        buf.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b"".join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield b"".join(buf)
+
+
+def _iterencode(obj, default, serialize_numpy, chunk_size):
+    """
+    Generate the pieces of the JSON encoding of obj for json_iterdumps.
+    """
+    if isinstance(obj, dict) and _estimate_size(obj, serialize_numpy) > chunk_size:
+        yield b"{"
+        for i, (k, v) in enumerate(obj.items()):
+            yield (b"," if i else b"") + _encode_key(k)
+            for piece in _iterencode(v, default, serialize_numpy, chunk_size):
+                yield piece
+        yield b"}"
+    elif _is_sequence(obj, serialize_numpy) and len(obj) and \
+            _estimate_size(obj, serialize_numpy) > chunk_size:
+        yield b"["
+        item_size = _estimate_size(obj[0], serialize_numpy)
+        if item_size > chunk_size:
+            for i, v in enumerate(obj):
+                if i:
+                    yield b","
+                for piece in _iterencode(v, default, serialize_numpy, chunk_size):
+                    yield piece
+        else:
+            # encode slices of about chunk_size bytes, without their enclosing brackets
+            n = max(1, chunk_size // item_size)
+            for i in range(0, len(obj), n):
+                yield (b"," if i else b"") + json_dumps(
+                    obj[i:i + n], default=default, serialize_numpy=serialize_numpy)[1:-1]
+        yield b"]"
+    else:
+        yield json_dumps(obj, default=default, serialize_numpy=serialize_numpy)
+
+
+def _is_sequence(obj, serialize_numpy):
+    """
+    Whether obj is encoded as a JSON array that json_iterdumps may split up.
+    """
+    return isinstance(obj, (list, tuple)) or \
+        (serialize_numpy and isinstance(obj, np.ndarray) and obj.ndim > 0)
+
+
+def _estimate_size(obj, serialize_numpy):
+    """
+    Cheap estimate of the encoded size of obj in bytes. Lists are assumed to be
+    homogeneous, so only their first item is looked at.
+    """
+    if isinstance(obj, dict):
+        return 2 + sum(len(six.text_type(k)) + 4 + _estimate_size(v, serialize_numpy)
+                       for k, v in obj.items())
+    if _is_sequence(obj, serialize_numpy):
+        if not len(obj):
+            return 2
+        return 2 + len(obj) * (_estimate_size(obj[0], serialize_numpy) + 1)
+    if isinstance(obj, six.string_types):
+        return len(obj) + 2
+    if isinstance(obj, np.ndarray):
+        return 20 * obj.size
+    # numbers, booleans, None and anything handed to default
+    return 20
+
+
 def recursive_update(d, u):
     """
     Recursive updates d with values from u
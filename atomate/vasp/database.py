@@ -2,14 +2,17 @@
 
 from __future__ import division, print_function, unicode_literals, absolute_import
 
-from monty.json import MontyEncoder, MontyDecoder
+from monty.json import MontyDecoder
 
 """
 This module defines the database classes.
 """
 
+import hashlib
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 import json
+import six
 from bson import ObjectId
 
 from pymatgen.electronic_structure.bandstructure import BandStructure, BandStructureSymmLine
@@ -18,8 +21,13 @@ from pymatgen.electronic_structure.dos import CompleteDos
 import gridfs
 from pymongo import ASCENDING, DESCENDING
 
-from atomate.utils.database import CalcDb
-from atomate.utils.utils import get_logger
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+from atomate.utils.database import CalcDb, set_client_side_ids
+from atomate.utils.utils import get_logger, json_dumps, json_iterdumps, monty_default
 
 __author__ = 'Kiran Mathew'
 __credits__ = 'Anubhav Jain'
@@ -68,7 +76,7 @@ class VaspCalcDb(CalcDb):
                                           ("completed_at", DESCENDING)],
                                          background=background)
 
-    def insert_task(self, task_doc, use_gridfs=False):
+    def insert_task(self, task_doc, use_gridfs=False, compress=True, fast_insert=False, batch_size=1):
         """
         Inserts a task document (e.g., as returned by Drone.assimilate()) into the database.
         Handles putting DOS, band structure and charge density into GridFS as needed.
@@ -78,81 +86,93 @@ class VaspCalcDb(CalcDb):
         Args:
             task_doc: (dict) the task document
             use_gridfs (bool) use gridfs for  bandstructures and DOS
+            compress (bool or str): compression of the GridFS payloads, see insert_gridfs
+            fast_insert (bool): insert the task document without waiting for an acknowledgement,
+                see CalcDb.insert_fast
+            batch_size (int): number of task documents to buffer before inserting them when
+                fast_insert is set
         Returns:
-            (int) - task_id of inserted document
+            (int) - task_id of inserted document (str if fast_insert is set)
+
+        The SHA-256 of each serialized GridFS payload is stored next to its file id (e.g., as
+        calcs_reversed.0.dos_sha256), which allows identical data to be found without reading it.
         """
         dos = None
         bs = None
         chgcar = None
-        aeccar0 = None
         write_aeccar = False
 
+        if use_gridfs:
+            # fail before anything is written to the database
+            _compression_type(compress)
+
         # move dos BS and CHGCAR from doc to gridfs
         if use_gridfs and "calcs_reversed" in task_doc:
+            calc = task_doc["calcs_reversed"][0]  # only store idx=0 (last step)
 
-            if "dos" in task_doc["calcs_reversed"][0]:  # only store idx=0 (last step)
-                dos = json.dumps(task_doc["calcs_reversed"][0]["dos"], cls=MontyEncoder)
-                del task_doc["calcs_reversed"][0]["dos"]
+            dos = calc.pop("dos", None)
+            bs = calc.pop("bandstructure", None)
 
-            if "bandstructure" in task_doc["calcs_reversed"][0]:  # only store idx=0 (last step)
-                bs = json.dumps(task_doc["calcs_reversed"][0]["bandstructure"], cls=MontyEncoder)
-                del task_doc["calcs_reversed"][0]["bandstructure"]
+            chgcar = calc.pop("chgcar", None)
+            if chgcar is not None:
+                chgcar = json_dumps(chgcar, default=monty_default)
 
-            if "chgcar" in task_doc["calcs_reversed"][0]:  # only store idx=0 DOS
-                chgcar = json.dumps(task_doc["calcs_reversed"][0]["chgcar"], cls=MontyEncoder)
-                del task_doc["calcs_reversed"][0]["chgcar"]
-
-            if "aeccar0" in task_doc["calcs_reversed"][0]:
-                aeccar0 = task_doc["calcs_reversed"][0]["aeccar0"]
-                aeccar2 = task_doc["calcs_reversed"][0]["aeccar2"]
+            aeccar0 = calc.pop("aeccar0", None)
+            if aeccar0 is not None:
+                aeccar2 = calc.pop("aeccar2")
                 # check if the aeccar is valid before insertion
                 if (aeccar0.data['total'] + aeccar2.data['total']).min() < 0:
                     logger.warning(f"The AECCAR seems to be corrupted for task_in directory {task_doc['dir_name']}\nSkipping storage of AECCARs")
-                    write_aeccar = False
                 else:
                     # overwrite the aeccar variable with their string representations to be inserted in GridFS
-                    aeccar0 = json.dumps(task_doc["calcs_reversed"][0]["aeccar0"], cls=MontyEncoder)
-                    aeccar2 = json.dumps(task_doc["calcs_reversed"][0]["aeccar2"], cls=MontyEncoder)
+                    aeccar0 = json_dumps(aeccar0, default=monty_default)
+                    aeccar2 = json_dumps(aeccar2, default=monty_default)
                     write_aeccar = True
 
-                del task_doc["calcs_reversed"][0]["aeccar0"]
-                del task_doc["calcs_reversed"][0]["aeccar2"]
-
-        # insert the task document
-        t_id = self.insert(task_doc)
+        # insert the task document; with fast_insert the ids are generated client-side,
+        # so the GridFS data is written first and the task document is inserted once,
+        # already pointing to it
+        if fast_insert:
+            t_id = set_client_side_ids(task_doc)
+        else:
+            t_id = self.insert(task_doc)
 
-        # insert the dos into gridfs and update the task document
+        # collect the data to be stored in gridfs as {key: serialized data}
+        # (DOS and band structure are streamed into GridFS to avoid building the full JSON string)
+        payloads = {}
         if dos:
-            dos_gfs_id, compression_type = self.insert_gridfs(dos, "dos_fs", task_id=t_id)
-            self.collection.update_one(
-                {"task_id": t_id}, {"$set": {"calcs_reversed.0.dos_compression": compression_type}})
-            self.collection.update_one({"task_id": t_id}, {"$set": {"calcs_reversed.0.dos_fs_id": dos_gfs_id}})
-
-        # insert the bandstructure into gridfs and update the task documents
+            payloads["dos"] = json_iterdumps(dos, default=monty_default, serialize_numpy=True)
         if bs:
-            bfs_gfs_id, compression_type = self.insert_gridfs(bs, "bandstructure_fs", task_id=t_id)
-            self.collection.update_one(
-                {"task_id": t_id}, {"$set": {"calcs_reversed.0.bandstructure_compression": compression_type}})
-            self.collection.update_one(
-                {"task_id": t_id}, {"$set": {"calcs_reversed.0.bandstructure_fs_id": bfs_gfs_id}})
-
-        # insert the CHGCAR file into gridfs and update the task documents
+            payloads["bandstructure"] = json_iterdumps(bs, default=monty_default, serialize_numpy=True)
         if chgcar:
-            chgcar_gfs_id, compression_type = self.insert_gridfs(chgcar, "chgcar_fs", task_id=t_id)
-            self.collection.update_one(
-                {"task_id": t_id}, {"$set": {"calcs_reversed.0.chgcar_compression": compression_type}})
-            self.collection.update_one({"task_id": t_id}, {"$set": {"calcs_reversed.0.chgcar_fs_id": chgcar_gfs_id}})
-
-        # insert the AECCARs file into gridfs and update the task documents
+            payloads["chgcar"] = [chgcar]
         if write_aeccar:
-            aeccar0_gfs_id, compression_type = self.insert_gridfs(aeccar0, "aeccar0_fs", task_id=t_id)
+            payloads["aeccar0"] = [aeccar0]
+            payloads["aeccar2"] = [aeccar2]
+
+        # insert the data into gridfs concurrently (pymongo releases the GIL while waiting on the
+        # network); the serialized bytes are hashed while they are uploaded, so each payload is
+        # encoded once
+        gridfs_fields = {}
+        if payloads:
+            shas = {key: hashlib.sha256() for key in payloads}
+            with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+                futures = {key: executor.submit(self.insert_gridfs, _hash_chunks(data, shas[key]),
+                                                "{}_fs".format(key), compress=compress, task_id=t_id)
+                           for key, data in payloads.items()}
+            for key, future in futures.items():
+                fs_id, compression_type = future.result()
+                gridfs_fields["{}_compression".format(key)] = compression_type
+                gridfs_fields["{}_fs_id".format(key)] = fs_id
+                gridfs_fields["{}_sha256".format(key)] = shas[key].hexdigest()
+
+        if fast_insert:
+            if gridfs_fields:
+                task_doc["calcs_reversed"][0].update(gridfs_fields)
+            self.insert_fast(task_doc, batch_size=batch_size)
+        elif gridfs_fields:
             self.collection.update_one(
-                {"task_id": t_id}, {"$set": {"calcs_reversed.0.aeccar0_compression": compression_type}})
-            self.collection.update_one({"task_id": t_id}, {"$set": {"calcs_reversed.0.aeccar0_fs_id": aeccar0_gfs_id}})
-            aeccar2_gfs_id, compression_type = self.insert_gridfs(aeccar2, "aeccar2_fs", task_id=t_id)
-            self.collection.update_one(
-                {"task_id": t_id}, {"$set": {"calcs_reversed.0.aeccar2_compression": compression_type}})
-            self.collection.update_one({"task_id": t_id}, {"$set": {"calcs_reversed.0.aeccar2_fs_id": aeccar2_gfs_id}})
+                {"task_id": t_id}, {"$set": {"calcs_reversed.0.{}".format(k): v for k, v in gridfs_fields.items()}})
         return t_id
 
     def retrieve_task(self, task_id):
@@ -188,36 +208,92 @@ class VaspCalcDb(CalcDb):
         Insert the given document into GridFS.
 
         Args:
-            d (dict): the document
+            d (str, bytes or iterable): the serialized document, or an iterable
+                yielding it in chunks (e.g., from json_iterdumps), which is
+                streamed into GridFS without assembling the full document in memory
             collection (string): the GridFS collection name
-            compress (bool): Whether to compress the data or not
+            compress (bool, int or str): Whether to compress the data or not. True, "zlib"
+                (or an int compression level) uses zlib, "lz4" uses LZ4 frames, which compress
+                and decompress much faster at a slightly lower ratio.
             oid (ObjectId()): the _id of the file; if specified, it must not already exist in GridFS
             task_id(int or str): the task_id to store into the gridfs metadata
         Returns:
             file id, the type of compression used.
         """
         oid = oid or ObjectId()
-        compression_type = None
-
-        if compress:
-            d = zlib.compress(d.encode(), compress)
-            compression_type = "zlib"
+        compression_type = _compression_type(compress)
+        if compression_type == "lz4":
+            compressor = lz4.frame.LZ4FrameCompressor()
+        elif compression_type == "zlib":
+            compressor = zlib.compressobj(1 if isinstance(compress, six.string_types) else compress)
+        else:
+            compressor = None
 
-        fs = gridfs.GridFS(self.db, collection)
+        # Putting task id in the metadata subdocument as per mongo specs:
+        # https://github.com/mongodb/specifications/blob/master/source/gridfs/gridfs-spec.rst#terms
+        metadata = {"compression": compression_type}
         if task_id:
-            # Putting task id in the metadata subdocument as per mongo specs:
-            # https://github.com/mongodb/specifications/blob/master/source/gridfs/gridfs-spec.rst#terms
-            fs_id = fs.put(d, _id=oid, metadata={"task_id": task_id, "compression": compression_type})
-        else:
-            fs_id = fs.put(d, _id=oid, metadata={"compression": compression_type})
+            metadata["task_id"] = task_id
+
+        if isinstance(d, (six.text_type, bytes)):
+            d = [d]
+
+        f = self.open_gridfs_upload(collection, _id=oid, metadata=metadata)
+        try:
+            if compression_type == "lz4":
+                f.write(compressor.begin())
+            for chunk in d:
+                if isinstance(chunk, six.text_type):
+                    chunk = chunk.encode()
+                f.write(compressor.compress(chunk) if compressor else chunk)
+            if compressor:
+                f.write(compressor.flush())
+        except Exception:
+            f.abort()
+            raise
+        f.close()
+
+        return oid, compression_type
+
+    def open_gridfs_upload(self, collection="fs", **kwargs):
+        """
+        Open a file-like handle to stream a new file into GridFS.
 
-        return fs_id, compression_type
+        Args:
+            collection (string): the GridFS collection name
+            kwargs: passed on to GridFS.new_file, e.g. _id or metadata
+        Returns:
+            gridfs.GridIn
+        """
+        return gridfs.GridFS(self.db, collection).new_file(**kwargs)
+
+    def read_gridfs(self, fs_id, collection="fs"):
+        """
+        Read a file from GridFS, decompressing it according to the compression
+        recorded in its metadata (files without it are assumed to be zlib compressed).
+
+        Args:
+            fs_id (ObjectId): the _id of the file
+            collection (string): the GridFS collection name
+        Returns:
+            bytes
+        """
+        f = gridfs.GridFS(self.db, collection).get(fs_id)
+        compression_type = (f.metadata or {}).get("compression", "zlib")
+        data = f.read()
+        if compression_type == "lz4":
+            if lz4 is None:
+                raise RuntimeError("'lz4' package is NOT installed but is required to "
+                                   "read lz4 compressed GridFS data.")
+            return lz4.frame.decompress(data)
+        elif compression_type == "zlib":
+            return zlib.decompress(data)
+        return data
 
     def get_band_structure(self, task_id):
         m_task = self.collection.find_one({"task_id": task_id}, {"calcs_reversed": 1})
         fs_id = m_task['calcs_reversed'][0]['bandstructure_fs_id']
-        fs = gridfs.GridFS(self.db, 'bandstructure_fs')
-        bs_json = zlib.decompress(fs.get(fs_id).read())
+        bs_json = self.read_gridfs(fs_id, 'bandstructure_fs')
         bs_dict = json.loads(bs_json.decode())
         if bs_dict["@class"] == "BandStructure":
             return BandStructure.from_dict(bs_dict)
@@ -229,8 +305,7 @@ class VaspCalcDb(CalcDb):
     def get_dos(self, task_id):
         m_task = self.collection.find_one({"task_id": task_id}, {"calcs_reversed": 1})
         fs_id = m_task['calcs_reversed'][0]['dos_fs_id']
-        fs = gridfs.GridFS(self.db, 'dos_fs')
-        dos_json = zlib.decompress(fs.get(fs_id).read())
+        dos_json = self.read_gridfs(fs_id, 'dos_fs')
         dos_dict = json.loads(dos_json.decode())
         return CompleteDos.from_dict(dos_dict)
 
@@ -238,8 +313,7 @@ class VaspCalcDb(CalcDb):
         # Not really used now, consier deleting
         m_task = self.collection.find_one({"task_id": task_id}, {"calcs_reversed": 1})
         fs_id = m_task['calcs_reversed'][0]['chgcar_fs_id']
-        fs = gridfs.GridFS(self.db, 'chgcar_fs')
-        return zlib.decompress(fs.get(fs_id).read())
+        return self.read_gridfs(fs_id, 'chgcar_fs')
 
     def get_chgcar(self, task_id):
         """
@@ -251,8 +325,7 @@ class VaspCalcDb(CalcDb):
         """
         m_task = self.collection.find_one({"task_id": task_id}, {"calcs_reversed": 1})
         fs_id = m_task['calcs_reversed'][0]['chgcar_fs_id']
-        fs = gridfs.GridFS(self.db, 'chgcar_fs')
-        chgcar_json = zlib.decompress(fs.get(fs_id).read())
+        chgcar_json = self.read_gridfs(fs_id, 'chgcar_fs')
         chgcar= json.loads(chgcar_json, cls=MontyDecoder)
         return chgcar
 
@@ -267,12 +340,10 @@ class VaspCalcDb(CalcDb):
         """
         m_task = self.collection.find_one({"task_id": task_id}, {"calcs_reversed": 1})
         fs_id = m_task['calcs_reversed'][0]['aeccar0_fs_id']
-        fs = gridfs.GridFS(self.db, 'aeccar0_fs')
-        aeccar_json = zlib.decompress(fs.get(fs_id).read())
+        aeccar_json = self.read_gridfs(fs_id, 'aeccar0_fs')
         aeccar0 = json.loads(aeccar_json, cls=MontyDecoder)
         fs_id = m_task['calcs_reversed'][0]['aeccar2_fs_id']
-        fs = gridfs.GridFS(self.db, 'aeccar2_fs')
-        aeccar_json = zlib.decompress(fs.get(fs_id).read())
+        aeccar_json = self.read_gridfs(fs_id, 'aeccar2_fs')
         aeccar2 = json.loads(aeccar_json, cls=MontyDecoder)
 
         if check_valid and (aeccar0.data['total'] + aeccar2.data['total']).min() < 0:
@@ -294,4 +365,28 @@ class VaspCalcDb(CalcDb):
         self.build_indexes()
 
 
+def _compression_type(compress):
+    """
+    Resolve the compress argument of insert_gridfs to the compression type that is
+    recorded in the GridFS metadata ("zlib", "lz4" or None).
+    """
+    if isinstance(compress, six.string_types):
+        if compress not in ("zlib", "lz4"):
+            raise ValueError("Unknown compression type for GridFS data: {}".format(compress))
+        if compress == "lz4" and lz4 is None:
+            raise RuntimeError("'lz4' package is NOT installed but is required for "
+                               "lz4 compression of GridFS data.")
+        return compress
+    return "zlib" if compress else None
+
+
+def _hash_chunks(chunks, sha):
+    """
+    Pass through an iterable of byte chunks, feeding each one into the given hash.
+    """
+    for chunk in chunks:
+        sha.update(chunk)
+        yield chunk
+
+
 # TODO: @albalu, @matk86, @computron - add BoltztrapCalcDB management here -computron, matk86
@@ -16,6 +16,7 @@ from collections import OrderedDict
 import json
 import glob
 import traceback
+from xml.etree import ElementTree
 
 from monty.io import zopen
 from monty.json import jsanitize
@@ -47,6 +48,8 @@ logger = get_logger(__name__)
 
 bader_exe_exists = which("bader") or which("bader.exe")
 
+_dos_efermi_patt = re.compile(br'<dos>\s*<i name="efermi">\s*(\S+)\s*</i>')
+
 class VaspDrone(AbstractDrone):
     """
     pymatgen-db VaspToDbTaskDrone with updated schema and documents processing methods.
@@ -322,7 +325,16 @@ class VaspDrone(AbstractDrone):
         """
         vasprun_file = os.path.join(dir_name, filename)
 
-        vrun = Vasprun(vasprun_file)
+        # the DOS is the largest block in vasprun.xml; only deserialize it if it will be stored
+        if str(self.parse_dos).lower() == "auto":
+            parse_dos = int(self.find_vasprun_item(vasprun_file, "incar", "NSW") or 0) < 1
+        else:
+            parse_dos = self.parse_dos != False
+
+        vrun = Vasprun(vasprun_file, parse_dos=parse_dos)
+        if not parse_dos:
+            # efermi is normally taken from the DOS block
+            vrun.efermi = self.read_dos_efermi(vasprun_file)
 
         d = vrun.as_dict()
 
@@ -355,7 +367,7 @@ class VaspDrone(AbstractDrone):
             if bs:
                 d["bandstructure"] = bs
 
-        if self.parse_dos != False:
+        if parse_dos:
             dos = self.process_dos(vrun)
             if dos:
                 d["dos"] = dos
@@ -441,6 +453,53 @@ class VaspDrone(AbstractDrone):
             raise ValueError("Unable to open CHGCAR/AECCAR file" )
         return chgcar
 
+    @staticmethod
+    def find_vasprun_item(vasprun_file, section, name):
+        """
+        Stream through a vasprun.xml file and return the text of the first
+        <i name="name"> element inside <section>, without building the tree.
+
+        :param vasprun_file: path to the (optionally compressed) vasprun.xml
+        :param section: tag of the enclosing element, e.g. "incar"
+        :param name: name attribute of the item, e.g. "NSW"
+        :return: the item text or None if it is not present
+        """
+        in_section = False
+        with zopen(vasprun_file, "rb") as f:
+            for event, elem in ElementTree.iterparse(f, events=("start", "end")):
+                if elem.tag == section:
+                    if event == "end":
+                        return None
+                    in_section = True
+                elif event == "end":
+                    if in_section and elem.tag == "i" and elem.get("name") == name:
+                        return elem.text
+                    elem.clear()
+        return None
+
+    @staticmethod
+    def read_dos_efermi(vasprun_file, chunk_size=1 << 20):
+        """
+        Read the Fermi level from the header of the <dos> block of a vasprun.xml file.
+        The file is scanned as raw bytes, which is much cheaper than parsing the XML.
+
+        :param vasprun_file: path to the (optionally compressed) vasprun.xml
+        :param chunk_size: number of bytes to read at a time
+        :return: efermi as written by VASP (full precision), or None if there is no DOS
+        """
+        tail = b""
+        with zopen(vasprun_file, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return None
+                data = tail + chunk
+                m = _dos_efermi_patt.search(data)
+                if m:
+                    return float(m.group(1))
+                # keep enough of the end to match a header split across chunks
+                tail = data[-256:]
+
     def process_bandstructure(self, vrun):
 
         vasprun_file = vrun.filename
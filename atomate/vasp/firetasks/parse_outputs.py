@@ -10,7 +10,7 @@ from datetime import datetime
 
 import numpy as np
 
-from monty.json import MontyEncoder, jsanitize
+from monty.json import jsanitize
 from pydash.objects import has, get
 
 from atomate.vasp.config import DEFUSE_UNSUCCESSFUL
@@ -24,13 +24,11 @@ from pymatgen.analysis.elasticity.stress import Stress
 from pymatgen.electronic_structure.boltztrap import BoltztrapAnalyzer
 from pymatgen.io.vasp.sets import get_vasprun_outcar
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
-from pymatgen.analysis.ferroelectricity.polarization import Polarization, get_total_ionic_dipole, \
-    EnergyTrend
-from pymatgen.analysis.magnetism import CollinearMagneticStructureAnalyzer, Ordering, magnetic_deformation
 from pymatgen.command_line.bader_caller import bader_analysis_from_path
 
-from atomate.common.firetasks.glue_tasks import get_calc_loc
-from atomate.utils.utils import env_chk, get_meta_from_structure
+from atomate.common.firetasks.glue_tasks import get_calc_dir
+from atomate.utils.utils import dump_json, env_chk, get_meta_from_structure, json_dumps, \
+    load_json, monty_default, task_doc_default
 from atomate.utils.utils import get_logger
 from atomate.vasp.database import VaspCalcDb
 from atomate.vasp.drones import VaspDrone
@@ -60,6 +58,8 @@ class VaspToDb(FiretaskBase):
         additional_fields (dict): dict of additional fields to add
         db_file (str): path to file containing the database credentials.
             Supports env_chk. Default: write data to JSON file.
+        gzip_json (bool): if no db_file is set, write the task doc gzip
+            compressed to task.json.gz instead of task.json. Default: False.
         fw_spec_field (str): if set, will update the task doc with the contents
             of this key in the fw_spec.
         defuse_unsuccessful (bool): this is a three-way toggle on what to do if
@@ -73,21 +73,31 @@ class VaspToDb(FiretaskBase):
             The path is a full mongo-style path so subdocuments can be referneced
             using dot notation and array keys can be referenced using the index.
             E.g "calcs_reversed.0.output.outar.run_stats"
+        gridfs_compression (str): compression used for the data stored in GridFS,
+            "zlib" (default) or "lz4" (faster, requires the lz4 package).
+        fast_insert (bool): insert the task document without waiting for the
+            database to acknowledge the write. There is no check for an existing
+            task with the same dir_name, and the task_id is the string of a
+            client-side generated ObjectId (not an integer from the counter).
+            Default: False.
+        batch_size (int): with fast_insert, number of task documents to buffer
+            and insert together. Buffered documents are not visible to later
+            Fireworks querying the tasks collection (e.g., analysis tasks) until
+            the buffer is full or the process exits normally, and they are lost
+            if the process is killed (e.g., at a walltime limit). Failed writes
+            are never reported. Default: 1.
     """
     optional_params = ["calc_dir", "calc_loc", "parse_dos", "bandstructure_mode",
                        "additional_fields", "db_file", "fw_spec_field", "defuse_unsuccessful",
-                       "task_fields_to_push", "parse_chgcar", "parse_aeccar"]
+                       "task_fields_to_push", "parse_chgcar", "parse_aeccar",
+                       "gridfs_compression", "fast_insert", "batch_size", "gzip_json"]
 
     def run_task(self, fw_spec):
         # get the directory that contains the VASP dir to parse
-        calc_dir = os.getcwd()
-        if "calc_dir" in self:
-            calc_dir = self["calc_dir"]
-        elif self.get("calc_loc"):
-            calc_dir = get_calc_loc(self["calc_loc"], fw_spec["calc_locs"])["path"]
+        calc_dir = get_calc_dir(self, fw_spec)
 
         # parse the VASP directory
-        logger.info("PARSING DIRECTORY: {}".format(calc_dir))
+        logger.info("PARSING DIRECTORY: %s", calc_dir)
 
         drone = VaspDrone(additional_fields=self.get("additional_fields"),
                           parse_dos=self.get("parse_dos", False),
@@ -107,16 +117,19 @@ class VaspToDb(FiretaskBase):
 
         # db insertion or taskdoc dump
         if not db_file:
-            with open("task.json", "w") as f:
-                f.write(json.dumps(task_doc, default=DATETIME_HANDLER))
+            filename = "task.json.gz" if self.get("gzip_json", False) else "task.json"
+            dump_json(task_doc, filename, default=task_doc_default, serialize_numpy=True)
         else:
             mmdb = VaspCalcDb.from_db_file(db_file, admin=True)
             t_id = mmdb.insert_task(
                 task_doc, use_gridfs=self.get("parse_dos", False)
                 or bool(self.get("bandstructure_mode", False))
                 or self.get("parse_chgcar", False)
-                or self.get("parse_aeccar", False))
-            logger.info("Finished parsing with task_id: {}".format(t_id))
+                or self.get("parse_aeccar", False),
+                compress=self.get("gridfs_compression", "zlib"),
+                fast_insert=self.get("fast_insert", False),
+                batch_size=self.get("batch_size", 1))
+            logger.info("Finished parsing with task_id: %s", t_id)
 
         defuse_children = False
         if task_doc["state"] != "successful":
@@ -162,7 +175,8 @@ class JsonToDb(FiretaskBase):
     in the tasks collection.
 
     Optional params:
-        json_filename (str): name of the JSON file to insert (default: "task.json")
+        json_filename (str): name of the JSON file to insert (default: "task.json"); files
+            ending in ".gz" are decompressed
         db_file (str): path to file containing the database credentials. Supports env_chk.
         calc_dir (str): path to dir (on current filesystem) that contains VASP output files.
             Default: use current working directory.
@@ -173,13 +187,11 @@ class JsonToDb(FiretaskBase):
 
         ref_file = self.get("json_filename", "task.json")
         calc_dir = self.get("calc_dir", os.getcwd())
-        with open(os.path.join(calc_dir, ref_file), "r") as fp:
-            task_doc = json.load(fp)
+        task_doc = load_json(os.path.join(calc_dir, ref_file))
 
         db_file = env_chk(self.get('db_file'), fw_spec)
         if not db_file:
-            with open("task.json", "w") as f:
-                f.write(json.dumps(task_doc, default=DATETIME_HANDLER))
+            dump_json(task_doc, "task.json", default=task_doc_default, serialize_numpy=True)
         else:
             mmdb = VaspCalcDb.from_db_file(db_file, admin=True)
             mmdb.insert(task_doc)
@@ -252,7 +264,7 @@ class BoltztrapToDb(FiretaskBase):
             mmdb = VaspCalcDb.from_db_file(db_file, admin=True)
 
             # dos gets inserted into GridFS
-            dos = json.dumps(d["dos"], cls=MontyEncoder)
+            dos = json_dumps(d["dos"], default=monty_default)
             fsid, compression = mmdb.insert_gridfs(dos, collection="dos_boltztrap_fs",
                                                    compress=True)
             d["dos_boltztrap_fs_id"] = fsid
@@ -778,6 +790,7 @@ class MagneticOrderingsToDB(FiretaskBase):
     optional_params = ["origins", "input_index"]
 
     def run_task(self, fw_spec):
+        from pymatgen.analysis.magnetism import CollinearMagneticStructureAnalyzer
 
         uuid = self["wf_uuid"]
         db_file = env_chk(self.get("db_file"), fw_spec)
@@ -951,6 +964,8 @@ class MagneticDeformationToDB(FiretaskBase):
     optional_params = ["to_db"]
 
     def run_task(self, fw_spec):
+        from pymatgen.analysis.magnetism import CollinearMagneticStructureAnalyzer, Ordering, \
+            magnetic_deformation
 
         uuid = self["wf_uuid"]
         db_file = env_chk(self.get("db_file"), fw_spec)
@@ -1028,6 +1043,8 @@ class PolarizationToDb(FiretaskBase):
     optional_params = ["db_file"]
 
     def run_task(self, fw_spec):
+        from pymatgen.analysis.ferroelectricity.polarization import Polarization, \
+            get_total_ionic_dipole, EnergyTrend
 
         wfid = list(filter(lambda x: 'wfid' in x, fw_spec['tags'])).pop()
         db_file = env_chk(self.get("db_file"), fw_spec)
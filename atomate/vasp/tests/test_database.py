@@ -0,0 +1,107 @@
+# coding: utf-8
+
+from __future__ import division, print_function, unicode_literals, absolute_import
+
+import hashlib
+import os
+import time
+import unittest
+
+from pymatgen.electronic_structure.dos import CompleteDos
+
+try:
+    import lz4
+except ImportError:
+    lz4 = None
+
+from atomate.utils.testing import AtomateTest
+from atomate.vasp.database import VaspCalcDb
+from atomate.vasp.drones import VaspDrone
+
+module_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)))
+db_dir = os.path.join(module_dir, "..", "..", "common", "test_files")
+
+
+class VaspCalcDbTest(AtomateTest):
+
+    @classmethod
+    def setUpClass(cls):
+        si_static = os.path.join(module_dir, "..", "test_files", "Si_static", "outputs")
+        cls.task_doc = VaspDrone().assimilate(si_static)
+
+    def setUp(self):
+        super(VaspCalcDbTest, self).setUp()
+        self.mmdb = VaspCalcDb.from_db_file(os.path.join(db_dir, "db.json"))
+
+    def get_task_doc(self):
+        d = dict(self.task_doc)
+        d["calcs_reversed"] = [dict(c) for c in d["calcs_reversed"]]
+        return d
+
+    def check_gridfs(self, compress):
+        t_id = self.mmdb.insert_task(self.get_task_doc(), use_gridfs=True, compress=compress)
+        calc = self.mmdb.collection.find_one({"task_id": t_id})["calcs_reversed"][0]
+        self.assertNotIn("dos", calc)
+        for key in ["dos", "bandstructure"]:
+            self.assertEqual(calc["{}_compression".format(key)], compress)
+            data = self.mmdb.read_gridfs(calc["{}_fs_id".format(key)], "{}_fs".format(key))
+            self.assertEqual(calc["{}_sha256".format(key)], hashlib.sha256(data).hexdigest())
+
+        ref = self.task_doc["calcs_reversed"][0]
+        dos = self.mmdb.get_dos(t_id)
+        self.assertIsInstance(dos, CompleteDos)
+        self.assertEqual(dos.as_dict()["energies"], ref["dos"]["energies"])
+        self.assertAlmostEqual(dos.efermi, ref["dos"]["efermi"])
+        bs = self.mmdb.get_band_structure(t_id)
+        self.assertEqual(bs.as_dict()["@class"], ref["bandstructure"]["@class"])
+        self.assertAlmostEqual(bs.efermi, ref["bandstructure"]["efermi"])
+
+    def test_insert_task_gridfs_zlib(self):
+        self.check_gridfs("zlib")
+
+    @unittest.skipIf(lz4 is None, "lz4 not installed")
+    def test_insert_task_gridfs_lz4(self):
+        self.check_gridfs("lz4")
+
+    def test_insert_gridfs(self):
+        data = b'{"a": [1, 2, 3], "b": "c"}'
+        for compress in [False, True, "zlib"] + (["lz4"] if lz4 else []):
+            for d in [data, data.decode(), iter([data[:5], data[5:].decode(), data[5:5]])]:
+                fs_id, compression_type = self.mmdb.insert_gridfs(d, compress=compress)
+                self.assertEqual(compression_type, "zlib" if compress is True else compress or None)
+                self.assertEqual(self.mmdb.read_gridfs(fs_id), data)
+
+        for compress in ["zstd", "LZ4"]:
+            self.assertRaises(ValueError, self.mmdb.insert_gridfs, data, compress=compress)
+            # the task document is not inserted either
+            self.assertRaises(ValueError, self.mmdb.insert_task, self.get_task_doc(),
+                              use_gridfs=True, compress=compress)
+        self.assertEqual(self.mmdb.collection.find().count(), 0)
+
+    def test_insert_task_fast(self):
+        t_id = self.mmdb.insert_task(self.get_task_doc(), use_gridfs=True, fast_insert=True)
+        self.assertIsInstance(t_id, str)
+
+        # the insert is not acknowledged, so wait for it to show up
+        for _ in range(50):
+            doc = self.mmdb.collection.find_one({"task_id": t_id})
+            if doc:
+                break
+            time.sleep(0.1)
+        calc = doc["calcs_reversed"][0]
+        self.assertNotIn("dos", calc)
+        self.assertNotIn("bandstructure", calc)
+        for key in ["dos", "bandstructure"]:
+            self.assertEqual(calc["{}_compression".format(key)], "zlib")
+            self.assertIn("{}_fs_id".format(key), calc)
+            self.assertIn("{}_sha256".format(key), calc)
+
+        dos = self.mmdb.get_dos(t_id)
+        self.assertIsInstance(dos, CompleteDos)
+        self.assertAlmostEqual(dos.efermi, self.task_doc["calcs_reversed"][0]["dos"]["efermi"])
+        bs = self.mmdb.get_band_structure(t_id)
+        self.assertAlmostEqual(bs.efermi, self.task_doc["calcs_reversed"][0]["bandstructure"]["efermi"])
+
+
+if __name__ == "__main__":
+    unittest.main()
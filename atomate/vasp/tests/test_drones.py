@@ -158,6 +158,28 @@ class VaspToDbTaskDroneTest(unittest.TestCase):
         cc = doc['calcs_reversed'][0]['aeccar2']
         self.assertAlmostEqual(cc.data['total'].sum()/cc.ngridpts, 8.01314480789829, 4)
 
+    def test_skip_dos(self):
+        vrun = os.path.join(self.relax, "vasprun.xml.gz")
+        self.assertEqual(VaspDrone.find_vasprun_item(vrun, "incar", "NSW").strip(), "99")
+        self.assertIsNone(VaspDrone.find_vasprun_item(vrun, "incar", "LCHARG"))
+
+        self.assertEqual(VaspDrone.read_dos_efermi(vrun), 5.63344915)
+
+        # "auto" only parses the DOS of static runs (NSW < 1)
+        drone = VaspDrone()
+        self.assertNotIn("dos", drone.assimilate(self.relax)["calcs_reversed"][0])
+        self.assertIn("dos", drone.assimilate(self.Si_static)["calcs_reversed"][0])
+
+        # skipping the DOS leaves efermi and the band edges untouched
+        for path in [self.relax, self.relax2, self.Si_static]:
+            doc_dos = VaspDrone(parse_dos=True).assimilate(path)
+            doc = VaspDrone(parse_dos=False).assimilate(path)
+            self.assertNotIn("dos", doc["calcs_reversed"][0])
+            for calc_dos, calc in zip(doc_dos["calcs_reversed"], doc["calcs_reversed"]):
+                self.assertEqual(calc["output"]["efermi"], calc_dos["output"]["efermi"])
+            for k in ["vbm", "cbm", "bandgap", "is_gap_direct", "is_metal"]:
+                self.assertEqual(doc["output"][k], doc_dos["output"][k])
+
 
 if __name__ == "__main__":
     unittest.main()
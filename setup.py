@@ -25,13 +25,16 @@ if __name__ == "__main__":
                           'custodian>=2018.6.11', 'monty>=1.0.2',
                           'tqdm>=4.7.4', 'six',
                           'pymatgen-diffusion>=2018.1.4',
-                          'pydash>=4.1.0'],
+                          'pydash>=4.1.0', 'pymongo>=3.9.0'],
         extras_require={'rtransfer': ['paramiko>=2.4.2'],
                         'plotting': ['matplotlib>=1.5.2'],
                         'phonons': ['phonopy>=1.10.8'],
+                        'fast-io': ['orjson>=3.0.0', 'lz4>=2.1.0'],
                         'complete': ['paramiko>=2.4.2',
                                      'matplotlib>=1.5.2',
-                                     'phonopy>=1.10.8']},
+                                     'phonopy>=1.10.8',
+                                     'orjson>=3.0.0',
+                                     'lz4>=2.1.0']},
         classifiers=['Programming Language :: Python :: 2.7',
                      "Programming Language :: Python :: 3",
                      "Programming Language :: Python :: 3.6",